@@ -2,7 +2,10 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
+import secrets
+import signal
 from datetime import datetime
 from typing import Optional
 
@@ -11,20 +14,43 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
 from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import RedisStorage
 from aiogram.types import CallbackQuery, Message, ReplyKeyboardRemove
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 from config import Settings
 from keyboards import (
     BACK_TO_SERVICES,
     CANCEL_FLOW,
+    NAV_KB,
+    SERVICE_BY_CALLBACK,
+    SERVICE_CALLBACKS,
+    SERVICE_KB,
     SERVICE_OPTIONS,
-    navigation_inline_keyboard,
-    service_inline_keyboard,
 )
-from leads import format_lead_summary, format_leads_for_admin, load_last_leads, save_lead_to_file
+from leads import (
+    format_lead_summary,
+    format_leads_for_admin,
+    load_last_leads,
+    save_lead_to_file,
+    start_lead_writer,
+    stop_lead_writer,
+)
+from middlewares import (
+    concurrency_limit_middleware,
+    rate_limit_middleware,
+    wait_for_pending_updates,
+)
 from states import LeadForm
 
+logger = logging.getLogger(__name__)
+
+# Seconds to let in-flight webhook updates finish on shutdown.
+SHUTDOWN_GRACE_PERIOD = 5
+
 settings = Settings.load()
 
 
@@ -63,6 +89,17 @@ SERVICE_CONFIRMED_TEXT = (
     "Как к вам обращаться?"
 )
 
+SERVICE_CONFIRMED_RENDERED = {
+    service: SERVICE_CONFIRMED_TEXT.format(service=service) for service in SERVICE_OPTIONS
+}
+
+DEFAULT_DETAIL_QUESTION = "Опишите ваш запрос подробнее, чтобы мы подготовили точный ответ."
+
+DETAIL_QUESTIONS_RENDERED = {
+    service: "\n".join(question) if isinstance(question, (list, tuple)) else str(question)
+    for service, question in DETAIL_QUESTIONS.items()
+}
+
 THANK_YOU_TEXT = (
     "<b>Спасибо!</b> Заявка отправлена нашему специалисту.\n"
     "Обычно отвечаем в рабочие часы в течение <b>10–30 минут</b>."
@@ -72,20 +109,30 @@ THANK_YOU_TEXT = (
 # === Helpers ===
 
 def _is_blank(text: Optional[str]) -> bool:
-    return not text or not text.strip()
+    return not text or text.isspace()
 
 
 # === Dispatcher ===
 
-storage = MemoryStorage()
+def _create_storage() -> BaseStorage:
+    if settings.redis_url:
+        return RedisStorage.from_url(
+            settings.redis_url,
+            key_builder=DefaultKeyBuilder(with_bot_id=True),
+        )
+    return MemoryStorage()
+
+
+storage = _create_storage()
 dp = Dispatcher(storage=storage)
+dp.update.outer_middleware(concurrency_limit_middleware)
 
 
 @dp.message(CommandStart())
 async def cmd_start(message: Message, state: FSMContext) -> None:
     """Reset state and show service selection menu."""
     await state.clear()
-    await message.answer(GREETING_TEXT, reply_markup=service_inline_keyboard())
+    await message.answer(GREETING_TEXT, reply_markup=SERVICE_KB)
     await state.set_state(LeadForm.choosing_service)
 
 
@@ -104,7 +151,7 @@ async def remind_service_choice(message: Message) -> None:
     """Ask the user to pick a service via inline buttons."""
     await message.answer(
         "Пожалуйста, выберите услугу кнопкой ниже, чтобы я понял ваш запрос.",
-        reply_markup=service_inline_keyboard(),
+        reply_markup=SERVICE_KB,
     )
 
 
@@ -115,7 +162,7 @@ async def navigate_back(callback: CallbackQuery, state: FSMContext) -> None:
     await state.clear()
     await callback.message.answer(
         "Давайте подберём услугу заново. Что вас интересует?",
-        reply_markup=service_inline_keyboard(),
+        reply_markup=SERVICE_KB,
     )
     await state.set_state(LeadForm.choosing_service)
 
@@ -131,47 +178,43 @@ async def navigate_cancel(callback: CallbackQuery, state: FSMContext) -> None:
     )
 
 
-@dp.callback_query(F.data.startswith("svc:"))
+@dp.callback_query(F.data.in_(SERVICE_CALLBACKS))
 async def process_service_callback(callback: CallbackQuery, state: FSMContext) -> None:
     """Handle service selection callback from any state."""
     await callback.answer()
 
-    data = callback.data or ""
-    try:
-        _, idx_str = data.split(":", 1)
-        idx = int(idx_str)
-    except (ValueError, IndexError):
-        idx = -1
-
-    if not (0 <= idx < len(SERVICE_OPTIONS)):
-        await callback.message.answer(
-            "Не удалось определить услугу. Пожалуйста, выберите вариант из списка.",
-            reply_markup=service_inline_keyboard(),
-        )
-        return
-
-    service = SERVICE_OPTIONS[idx]
+    service = SERVICE_BY_CALLBACK[callback.data]
     await state.clear()
     await state.update_data(service=service)
     await callback.message.answer(
-        SERVICE_CONFIRMED_TEXT.format(service=service),
-        reply_markup=navigation_inline_keyboard(),
+        SERVICE_CONFIRMED_RENDERED[service],
+        reply_markup=NAV_KB,
     )
     await state.set_state(LeadForm.getting_name)
 
 
+@dp.callback_query(F.data.startswith("svc:"))
+async def process_unknown_service_callback(callback: CallbackQuery) -> None:
+    """Handle service buttons that no longer match a known service."""
+    await callback.answer()
+    await callback.message.answer(
+        "Не удалось определить услугу. Пожалуйста, выберите вариант из списка.",
+        reply_markup=SERVICE_KB,
+    )
+
+
 @dp.message(LeadForm.getting_name)
 async def process_name(message: Message, state: FSMContext) -> None:
     """Ask for the client's name."""
     if _is_blank(message.text):
         await message.answer(
             "Пожалуйста, укажите, как к вам обращаться.",
-            reply_markup=navigation_inline_keyboard(),
+            reply_markup=NAV_KB,
         )
         return
 
     await state.update_data(name=message.text.strip())
-    await message.answer("Из какого вы города?", reply_markup=navigation_inline_keyboard())
+    await message.answer("Из какого вы города?", reply_markup=NAV_KB)
     await state.set_state(LeadForm.getting_city)
 
 
@@ -181,14 +224,14 @@ async def process_city(message: Message, state: FSMContext) -> None:
     if _is_blank(message.text):
         await message.answer(
             "Напишите, пожалуйста, ваш город — это важно для логистики.",
-            reply_markup=navigation_inline_keyboard(),
+            reply_markup=NAV_KB,
         )
         return
 
     await state.update_data(city=message.text.strip())
     await message.answer(
         "Оставьте контакт для связи: телефон или @ник в Telegram.",
-        reply_markup=navigation_inline_keyboard(),
+        reply_markup=NAV_KB,
     )
     await state.set_state(LeadForm.getting_contact)
 
@@ -199,19 +242,15 @@ async def process_contact(message: Message, state: FSMContext) -> None:
     if _is_blank(message.text):
         await message.answer(
             "Нужен контакт, чтобы связаться: номер телефона или @ник в Telegram.",
-            reply_markup=navigation_inline_keyboard(),
+            reply_markup=NAV_KB,
         )
         return
 
     await state.update_data(contact=message.text.strip())
     data = await state.get_data()
     service = data.get("service", SERVICE_OPTIONS[0])
-    raw_question = DETAIL_QUESTIONS.get(
-        service,
-        "Опишите ваш запрос подробнее, чтобы мы подготовили точный ответ.",
-    )
-    question = "\n".join(raw_question) if isinstance(raw_question, (list, tuple)) else str(raw_question)
-    await message.answer(question, reply_markup=navigation_inline_keyboard())
+    question = DETAIL_QUESTIONS_RENDERED.get(service, DEFAULT_DETAIL_QUESTION)
+    await message.answer(question, reply_markup=NAV_KB)
     await state.set_state(LeadForm.getting_details)
 
 
@@ -221,12 +260,13 @@ async def process_details(message: Message, state: FSMContext) -> None:
     if _is_blank(message.text):
         await message.answer(
             "Добавьте, пожалуйста, детали запроса, чтобы мы быстро помогли.",
-            reply_markup=navigation_inline_keyboard(),
+            reply_markup=NAV_KB,
         )
         return
 
     await state.update_data(details=message.text.strip())
     data = await state.get_data()
+    user = message.from_user
 
     lead = {
         "created_at": datetime.now().isoformat(sep=" ", timespec="seconds"),
@@ -235,8 +275,8 @@ async def process_details(message: Message, state: FSMContext) -> None:
         "city": data.get("city"),
         "contact": data.get("contact"),
         "details": data.get("details"),
-        "tg_id": message.from_user.id if message.from_user else None,
-        "username": message.from_user.username if message.from_user else None,
+        "tg_id": user.id if user else None,
+        "username": user.username if user else None,
     }
 
     save_lead_to_file(lead, settings.leads_file)
@@ -250,7 +290,7 @@ async def process_details(message: Message, state: FSMContext) -> None:
         try:
             await message.bot.send_message(settings.admin_chat_id, summary)
         except Exception:
-            logging.exception("Не удалось отправить заявку админу")
+            logger.exception("Не удалось отправить заявку админу")
 
     await state.clear()
     await message.answer("Если захотите оформить ещё одну заявку — нажмите /start.")
@@ -259,7 +299,8 @@ async def process_details(message: Message, state: FSMContext) -> None:
 @dp.message(Command("leads"))
 async def cmd_leads(message: Message) -> None:
     """Show last leads to admin."""
-    if not settings.admin_chat_id or message.from_user.id != settings.admin_chat_id:
+    user = message.from_user
+    if not settings.admin_chat_id or not user or user.id != settings.admin_chat_id:
         await message.answer("Команда доступна только администратору.")
         return
 
@@ -274,21 +315,85 @@ async def cmd_leads(message: Message) -> None:
         await message.answer(chunk)
 
 
+async def _run_webhook(bot: Bot) -> None:
+    """Serve updates pushed by Telegram to the configured webhook."""
+    # Without a secret anyone could POST forged updates, e.g. pose as the admin for /leads.
+    secret_token = settings.webhook_secret or secrets.token_urlsafe(32)
+    await bot.set_webhook(settings.webhook_url, secret_token=secret_token)
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=secret_token,
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    stop_signals = (signal.SIGINT, signal.SIGTERM)
+    for sig in stop_signals:
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webapp_host, port=settings.webapp_port)
+    try:
+        await site.start()
+        logger.info(
+            "Webhook server listening on %s:%s%s",
+            settings.webapp_host,
+            settings.webapp_port,
+            settings.webhook_path,
+        )
+        await stop.wait()
+        logger.info("Stopping webhook server")
+        await site.stop()
+        if not await wait_for_pending_updates(SHUTDOWN_GRACE_PERIOD):
+            logger.warning("Не все обновления успели обработаться до остановки")
+    finally:
+        for sig in stop_signals:
+            with contextlib.suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+        await runner.cleanup()
+
+
 async def main() -> None:
     """Entrypoint for running the bot."""
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
-    logging.info("Starting bot")
+    # aiogram.event logs every handled update at INFO level.
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    logger.info("Starting bot")
 
     bot = Bot(
         token=settings.bot_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    bot.session.middleware(rate_limit_middleware)
 
-    await dp.start_polling(bot)
+    lead_writer = await start_lead_writer(settings.leads_file)
+    try:
+        if settings.webhook_url:
+            await _run_webhook(bot)
+        else:
+            # getUpdates is rejected while a webhook from a previous run is set.
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await stop_lead_writer(lead_writer)
+        # Also covers failures in set_webhook/delete_webhook before the server or polling starts.
+        await bot.session.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -17,6 +17,17 @@ def _parse_admin_chat_id(raw_value: str | None) -> Optional[int]:
     return value if value != 0 else None
 
 
+def _parse_port(raw_value: str | None, default: int) -> int:
+    """Parse a TCP port from environment, falling back to `default`."""
+    if not raw_value:
+        return default
+    try:
+        value = int(raw_value)
+    except ValueError:
+        return default
+    return value if 0 < value < 65536 else default
+
+
 @dataclass(frozen=True)
 class Settings:
     """Bot settings loaded from environment variables."""
@@ -24,6 +35,12 @@ class Settings:
     bot_token: str
     admin_chat_id: Optional[int]
     leads_file: str = "leads.jsonl"
+    redis_url: Optional[str] = None
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[str] = None
+    webapp_host: str = "0.0.0.0"
+    webapp_port: int = 8080
 
     @classmethod
     def load(cls) -> "Settings":
@@ -32,4 +49,14 @@ class Settings:
             raise RuntimeError("Не найден BOT_TOKEN в переменных окружения")
 
         admin_chat_id = _parse_admin_chat_id(os.getenv("ADMIN_CHAT_ID"))
-        return cls(bot_token=bot_token, admin_chat_id=admin_chat_id)
+        redis_url = os.getenv("REDIS_URL") or None
+        return cls(
+            bot_token=bot_token,
+            admin_chat_id=admin_chat_id,
+            redis_url=redis_url,
+            webhook_url=os.getenv("WEBHOOK_URL") or None,
+            webhook_path=os.getenv("WEBHOOK_PATH") or "/webhook",
+            webhook_secret=os.getenv("WEBHOOK_SECRET") or None,
+            webapp_host=os.getenv("WEBAPP_HOST") or "0.0.0.0",
+            webapp_port=_parse_port(os.getenv("WEBAPP_PORT"), 8080),
+        )
@@ -12,29 +12,38 @@ SERVICE_OPTIONS = [
 BACK_TO_SERVICES = "nav:services"
 CANCEL_FLOW = "nav:cancel"
 
+SERVICE_BY_CALLBACK = {f"svc:{idx}": service for idx, service in enumerate(SERVICE_OPTIONS)}
+SERVICE_CALLBACKS = frozenset(SERVICE_BY_CALLBACK)
 
-def service_inline_keyboard() -> InlineKeyboardMarkup:
-    """Create inline keyboard for service selection."""
-    buttons = [
-        [InlineKeyboardButton(text=service, callback_data=f"svc:{idx}")]
-        for idx, service in enumerate(SERVICE_OPTIONS)
+
+SERVICE_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text=service, callback_data=callback_data)]
+        for callback_data, service in SERVICE_BY_CALLBACK.items()
+    ]
+)
+
+NAV_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="↩️ Выбрать другую услугу", callback_data=BACK_TO_SERVICES
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="⏹ Завершить диалог", callback_data=CANCEL_FLOW
+            )
+        ],
     ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+)
+
+
+def service_inline_keyboard() -> InlineKeyboardMarkup:
+    """Inline keyboard for service selection."""
+    return SERVICE_KB
 
 
 def navigation_inline_keyboard() -> InlineKeyboardMarkup:
     """Inline keyboard for returning to the service menu or cancelling."""
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="↩️ Выбрать другую услугу", callback_data=BACK_TO_SERVICES
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="⏹ Завершить диалог", callback_data=CANCEL_FLOW
-                )
-            ],
-        ]
-    )
+    return NAV_KB
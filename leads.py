@@ -1,41 +1,132 @@
 """Utilities for saving and formatting leads."""
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import os
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, List, Optional
 
+import aiofiles
+import orjson
+from aiofiles.threadpool.binary import AsyncBufferedIOBase
 
-def save_lead_to_file(lead: dict, filepath: str) -> None:
-    """Append a lead to a JSON Lines file."""
+logger = logging.getLogger(__name__)
+
+_TAIL_CHUNK_SIZE = 64 * 1024
+# Telegram caps messages at 4096 UTF-16 code units; keep a safety margin.
+_ADMIN_CHUNK_LIMIT = 3900
+
+_LEAD_QUEUE_SIZE = 1000
+
+# Created in start_lead_writer: on Python < 3.10 a queue binds to the loop current at creation.
+_lead_queue: Optional[asyncio.Queue[dict]] = None
+_writer_task: Optional[asyncio.Task] = None
+
+
+def _append_leads(leads: List[dict], filepath: str) -> None:
+    """Append leads to a JSON Lines file synchronously."""
     try:
         Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, "a", encoding="utf-8") as file:
-            json.dump(lead, file, ensure_ascii=False)
-            file.write("\n")
+        with open(filepath, "ab") as file:
+            file.write(b"".join(orjson.dumps(lead) + b"\n" for lead in leads))
     except Exception:
-        logging.exception("Не удалось сохранить заявку в файл %s", filepath)
+        logger.exception("Не удалось сохранить заявку в файл %s", filepath)
+
+
+async def _writer_loop(
+    queue: asyncio.Queue[dict], file: AsyncBufferedIOBase, filepath: str
+) -> None:
+    """Drain the lead queue into an open JSON Lines file."""
+    try:
+        while True:
+            lead = await queue.get()
+            try:
+                await file.write(orjson.dumps(lead) + b"\n")
+                await file.flush()
+            except Exception:
+                logger.exception("Фоновая запись заявки не удалась, пишу напрямую в %s", filepath)
+                _append_leads([lead], filepath)
+            finally:
+                queue.task_done()
+    finally:
+        await file.close()
+
+
+async def start_lead_writer(filepath: str) -> asyncio.Task:
+    """Open the leads file and spawn the task that persists queued leads.
+
+    Raises if the file cannot be opened, so a bad path fails at startup.
+    """
+    global _lead_queue, _writer_task
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    file = await aiofiles.open(filepath, "ab")
+    _lead_queue = asyncio.Queue(maxsize=_LEAD_QUEUE_SIZE)
+    _writer_task = asyncio.create_task(_writer_loop(_lead_queue, file, filepath))
+    return _writer_task
+
+
+async def stop_lead_writer(task: asyncio.Task) -> None:
+    """Wait until queued leads are written, then stop the writer."""
+    await _lead_queue.join()
+    task.cancel()
+    await asyncio.wait([task])
+
+
+def save_lead_to_file(lead: dict, filepath: str) -> None:
+    """Queue a lead for the background writer, or write it directly if the writer is unavailable."""
+    if _lead_queue is None or _writer_task is None or _writer_task.done():
+        logger.warning("Фоновая запись заявок не запущена, пишу заявку напрямую в %s", filepath)
+        _append_leads([lead], filepath)
+        return
+    try:
+        _lead_queue.put_nowait(lead)
+    except asyncio.QueueFull:
+        logger.warning("Очередь заявок переполнена, пишу заявку напрямую в %s", filepath)
+        _append_leads([lead], filepath)
+
+
+def _parse_lead_line(line: bytes, filepath: str) -> Optional[dict]:
+    """Decode a single JSON Lines record, skipping blank or broken lines."""
+    if not line or line.isspace():
+        return None
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        logger.warning("Пропущена повреждённая строка в %s", filepath)
+        return None
 
 
 def load_last_leads(filepath: str, limit: int = 10) -> List[dict]:
-    """Load the last `limit` leads from the file."""
+    """Load the last `limit` leads from the file, reading it from the end."""
+    if limit <= 0:
+        return []
+
     leads: List[dict] = []
     try:
-        with open(filepath, "r", encoding="utf-8") as file:
-            for line in file:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    leads.append(json.loads(line))
-                except json.JSONDecodeError:
-                    logging.warning("Пропущена повреждённая строка в %s", filepath)
-                    continue
+        with open(filepath, "rb") as file:
+            file.seek(0, os.SEEK_END)
+            position = file.tell()
+            remainder = b""
+            while position > 0 and len(leads) < limit:
+                read_size = min(_TAIL_CHUNK_SIZE, position)
+                position -= read_size
+                file.seek(position)
+                lines = (file.read(read_size) + remainder).split(b"\n")
+                # The first line may be cut by the chunk boundary.
+                remainder = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    lead = _parse_lead_line(line, filepath)
+                    if lead is None:
+                        continue
+                    leads.append(lead)
+                    if len(leads) >= limit:
+                        break
     except FileNotFoundError:
         return []
 
-    return leads[-limit:]
+    leads.reverse()
+    return leads
 
 
 def format_lead_summary(lead: dict, include_meta: bool = True) -> str:
@@ -67,6 +158,11 @@ def format_lead_summary(lead: dict, include_meta: bool = True) -> str:
     return "\n".join(line for line in base_info if line is not None)
 
 
+def _utf16_len(text: str) -> int:
+    """Length of `text` as Telegram counts it, in UTF-16 code units."""
+    return len(text.encode("utf-16-le")) // 2
+
+
 def format_leads_for_admin(leads: List[dict]) -> List[str]:
     """Split leads into chunks suitable for Telegram messages."""
     items: List[str] = []
@@ -78,17 +174,17 @@ def format_leads_for_admin(leads: List[dict]) -> List[str]:
         items.append("\n".join(line for line in [header, time_line, body] if line))
 
     chunks: List[str] = []
-    current = ""
+    buffer: List[str] = []
+    buffer_len = 0
     for part in items:
-        if not current:
-            current = part
-            continue
-        if len(current) + 2 + len(part) > 3900:
-            chunks.append(current)
-            current = part
-        else:
-            current += "\n\n" + part
-
-    if current:
-        chunks.append(current)
+        part_len = _utf16_len(part)
+        if buffer and buffer_len + 2 + part_len > _ADMIN_CHUNK_LIMIT:
+            chunks.append("\n\n".join(buffer))
+            buffer = []
+            buffer_len = 0
+        buffer_len += part_len + 2 if buffer else part_len
+        buffer.append(part)
+
+    if buffer:
+        chunks.append("\n\n".join(buffer))
     return chunks
@@ -0,0 +1,90 @@
+"""Dispatcher and bot session middlewares."""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, DefaultDict, Dict, Optional, Tuple
+
+from aiogram.types import TelegramObject
+from aiolimiter import AsyncLimiter
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+
+MAX_CONCURRENT_UPDATES = 64
+
+_SEND_METHOD_PREFIXES = ("send", "copy", "forward")
+
+# Created on first use: on Python < 3.10 these bind to the loop current at creation.
+_handler_semaphore: Optional[asyncio.Semaphore] = None
+_updates_idle: Optional[asyncio.Event] = None
+_pending_updates = 0
+# Telegram allows about 30 messages per second bot-wide and 20 per minute per group.
+# Group limiters are never evicted: the bot lives in private chats and only a handful
+# of groups (such as an admin group), so the dict stays small.
+_global_limiter = AsyncLimiter(30, 1)
+_group_limiters: DefaultDict[int, AsyncLimiter] = defaultdict(lambda: AsyncLimiter(20, 60))
+
+
+def _concurrency_primitives() -> Tuple[asyncio.Semaphore, asyncio.Event]:
+    global _handler_semaphore, _updates_idle
+    if _handler_semaphore is None or _updates_idle is None:
+        _handler_semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPDATES)
+        _updates_idle = asyncio.Event()
+        _updates_idle.set()
+    return _handler_semaphore, _updates_idle
+
+
+async def concurrency_limit_middleware(
+    handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+    event: TelegramObject,
+    data: Dict[str, Any],
+) -> Any:
+    """Cap the number of updates processed at the same time."""
+    global _pending_updates
+    semaphore, updates_idle = _concurrency_primitives()
+    _pending_updates += 1
+    updates_idle.clear()
+    try:
+        async with semaphore:
+            return await handler(event, data)
+    finally:
+        _pending_updates -= 1
+        if not _pending_updates:
+            updates_idle.set()
+
+
+async def wait_for_pending_updates(timeout: float) -> bool:
+    """Wait until no updates are being processed; return False on timeout."""
+    _, updates_idle = _concurrency_primitives()
+    try:
+        await asyncio.wait_for(updates_idle.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def rate_limit_middleware(
+    make_request: NextRequestMiddlewareType[Any],
+    bot: Bot,
+    method: TelegramMethod[Any],
+) -> Response[Any]:
+    """Throttle outgoing messages to stay within Telegram's flood limits.
+
+    Only the bot-wide and per-group limits are enforced. The roughly one message
+    per second per private chat limit is deliberately not handled here, because
+    handlers send to a private chat one reply at a time.
+    """
+    if not method.__api_method__.startswith(_SEND_METHOD_PREFIXES):
+        return await make_request(bot, method)
+
+    chat_id = getattr(method, "chat_id", None)
+    if isinstance(chat_id, int) and chat_id < 0:
+        async with _group_limiters[chat_id]:
+            async with _global_limiter:
+                return await make_request(bot, method)
+
+    async with _global_limiter:
+        return await make_request(bot, method)